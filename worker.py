@@ -8,27 +8,72 @@ Usage:
     worker.py delegate --swarm --task "..."   # Agent Swarm mode (decomposes into sub-agents)
     worker.py delegate --think --task "..."   # Enable thinking/reasoning mode
     worker.py delegate --image path.jpg ...   # With image input (vision)
+    worker.py delegate --batch tasks.jsonl    # Run many delegations concurrently
     worker.py stats                           # Show delegation stats
+    worker.py migrate-log                     # Convert older logs to the current format
 """
 
 import argparse
-import base64
+import atexit
+import copy
+import functools
+import hashlib
+import io
 import json
 import os
 import sys
+import time
+import zlib
 from datetime import datetime
 from pathlib import Path
 
 try:
-    import requests
+    import orjson
 except ImportError:
-    print("Installing requests...")
-    os.system(f"{sys.executable} -m pip install requests -q")
-    import requests
+    orjson = None  # Fall back to stdlib json
+
+try:
+    from cachetools import TTLCache
+except ImportError:
+    TTLCache = None  # Exact-match cache disabled
 
 OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
-LOG_FILE = Path.home() / "clawd" / "logs" / "ollama-delegations.jsonl"
+LOG_FILE = Path.home() / "clawd" / "logs" / "ollama-delegations.msgpack"
+LEGACY_LOG_FILE = LOG_FILE.with_suffix(".jsonl")
+STATS_FILE = LOG_FILE.with_name("ollama-delegations.stats.json")
+STATS_VERSION = 2  # Bump when the aggregate or log schema changes
+
+# Bits of the "fl" field in a log entry
+LOG_FLAG_THINKING = 1
+LOG_FLAG_SWARM = 2
+LOG_FLAG_IMAGE = 4
+LOG_FLAG_TOOLS = 8
+LOG_FLAG_CACHED = 16
+# Every compact entry packs as an 8-key map whose first key is "t"; used to
+# find the next record after corrupt bytes in the log
+LOG_FRAME_MARK = b"\x88\xa1t"
 DEFAULT_MODEL = "kimi-k2.5:cloud"
+DEFAULT_CONCURRENCY = 4
+
+CACHE_DIR = Path.home() / "clawd" / "cache"
+CACHE_TTL = 3600  # seconds
+CACHE_DB = CACHE_DIR / "ollama.sqlite"
+SEMANTIC_CACHE_DB = CACHE_DIR / "ollama-semantic.sqlite"
+SEMANTIC_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SEMANTIC_THRESHOLD = 0.85
+
+RECOMPRESS_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+RECOMPRESS_MIN_BYTES = 100 * 1024
+
+# Exact-match response cache, keyed by sha256 of the canonical payload
+# (in-process tier, backed by the SQLite cache shared across invocations)
+_EXACT_CACHE = TTLCache(maxsize=1000, ttl=CACHE_TTL) if TTLCache else None
+_CACHE_DB = None
+_CACHE_FAILED = set()  # Cache tiers turned off after an error
+_EMBEDDER = None
+_LOG_FH = None
+_CLIENT = None
+_TOOLS_CACHE = {}  # path -> (st_mtime_ns, st_size, parsed tools)
 
 # The magic system prompt that triggers agent swarm behavior
 SWARM_SYSTEM_PROMPT = """You are an AI with Agent Swarm capabilities. For complex tasks, you MUST:
@@ -46,12 +91,112 @@ Format your response as:
 - [ORCHESTRATION COMPLETE - All agents terminated]
 
 Be thorough. Each agent should be an expert in their domain. The synthesis should add value beyond just combining outputs."""
+SWARM_SYSTEM_PROMPT = sys.intern(SWARM_SYSTEM_PROMPT)
+
+# Prompts for client-side parallel swarm (--swarm --agents N)
+SWARM_DECOMPOSE_PROMPT = """You are the orchestrator of an agent swarm. Decompose the user's task into distinct, independent sub-tasks, one per specialized agent.
+
+Respond with JSON only, in exactly this shape:
+{"agents": [{"id": 1, "role": "<agent's area of expertise>", "subtask": "<self-contained instructions for this agent>"}]}
+
+Each subtask must be answerable on its own, without seeing the other agents' work."""
+
+SWARM_AGENT_PROMPT = """You are one specialized agent in an agent swarm. Other agents are covering the rest of the task in parallel; focus only on your assigned sub-task and go deep within your domain."""
+
+SWARM_SYNTHESIS_PROMPT = """You are the Synthesis Coordinator of an agent swarm. You receive the original task and the reports of several specialized agents. Integrate their findings into one unified response: resolve contradictions, fill gaps, and add insight beyond simply combining the reports."""
+
+SWARM_MAX_CONCURRENCY = 8
+
+
+# The HTTP client is imported on first use: it dominates start-up time, and
+# `stats` doesn't need it.
+
+def _get_httpx():
+    """Import httpx, installing it first if it's missing."""
+    try:
+        import httpx
+    except ImportError:
+        print("Installing httpx...", file=sys.stderr)
+        os.system(f"{sys.executable} -m pip install httpx -q")
+        import httpx
+    return httpx
+
+
+def _http2_enabled() -> bool:
+    """Negotiate HTTP/2 when the optional h2 package is installed.
+    
+    HTTP/2 is only negotiated over TLS (e.g. a remote https OLLAMA_HOST); a
+    plain-http local Ollama keeps using pooled HTTP/1.1 connections.
+    """
+    import importlib.util
+    return importlib.util.find_spec("h2") is not None
+
+
+def _http_timeout(seconds: float):
+    """Fail fast on connect, but allow long gaps while the model generates."""
+    return _get_httpx().Timeout(seconds, connect=5.0)
+
+
+def _get_client():
+    """One pooled client for all sync calls, so keep-alive connections are reused."""
+    global _CLIENT
+    if _CLIENT is None:
+        httpx = _get_httpx()
+        transport = httpx.HTTPTransport(
+            http2=_http2_enabled(),
+            retries=2,  # Connection failures only
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+        _CLIENT = httpx.Client(transport=transport, timeout=_http_timeout(300))
+        atexit.register(_CLIENT.close)
+    return _CLIENT
+
+
+def _async_client(concurrency: int):
+    """A pooled async client sized for `concurrency` requests in flight."""
+    httpx = _get_httpx()
+    transport = httpx.AsyncHTTPTransport(
+        http2=_http2_enabled(),
+        retries=2,
+        limits=httpx.Limits(
+            max_connections=concurrency,
+            max_keepalive_connections=concurrency,
+            keepalive_expiry=60,
+        ),
+    )
+    return httpx.AsyncClient(transport=transport, timeout=_http_timeout(300))
+
+
+def _get_msgpack():
+    """Import msgpack (the log format), installing it first if it's missing."""
+    try:
+        import msgpack
+    except ImportError:
+        print("Installing msgpack...", file=sys.stderr)
+        os.system(f"{sys.executable} -m pip install msgpack -q")
+        import msgpack
+    return msgpack
+
+
+def _json_loads(data):
+    """Parse JSON from bytes or str, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_line(obj) -> bytes:
+    """Serialize an object as one newline-terminated JSONL record."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj) + "\n").encode()
 
 
 def list_models():
     """List available Ollama models."""
+    httpx = _get_httpx()
     try:
-        resp = requests.get(f"{OLLAMA_HOST}/api/tags", timeout=10)
+        resp = _get_client().get(f"{OLLAMA_HOST}/api/tags", timeout=10)
         resp.raise_for_status()
         data = resp.json()
         
@@ -69,19 +214,89 @@ def list_models():
         print("\nTo add cloud models: ollama pull <model>:cloud")
         print("Available: kimi-k2.5, glm-4.7, deepseek-v3.1, qwen3-vl, devstral-2")
             
-    except requests.exceptions.ConnectionError:
+    except httpx.TransportError:  # Refused, reset, timed out, ...
         print("Error: Cannot connect to Ollama. Is it running?")
         print("Start with: ollama serve")
         sys.exit(1)
 
 
-def encode_image(image_path: str) -> str:
-    """Encode an image file to base64."""
+def _recompress_image(image_path: str):
+    """Re-encode a photo-style image as WEBP, or None if it isn't worth it.
+    
+    Only jpg/png/bmp files of at least RECOMPRESS_MIN_BYTES are considered,
+    and the result is only used when it is actually smaller.
+    """
+    if Path(image_path).suffix.lower() not in RECOMPRESS_EXTENSIONS:
+        return None
+    size = os.path.getsize(image_path)
+    if size < RECOMPRESS_MIN_BYTES:
+        return None
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        print("Warning: --recompress needs Pillow (pip install Pillow); sending original", file=sys.stderr)
+        return None
+    
+    try:
+        with Image.open(image_path) as img:
+            # WEBP output drops EXIF, so bake the orientation into the pixels
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+            buf = io.BytesIO()
+            img.save(buf, format="WEBP", quality=85, method=4)
+    except (OSError, ValueError) as e:
+        print(f"Warning: couldn't recompress {image_path} ({e}); sending original", file=sys.stderr)
+        return None
+    data = buf.getvalue()
+    return data if len(data) < size else None
+
+
+def encode_image(image_path: str, recompress: bool = False) -> str:
+    """Encode an image file to base64, optionally recompressing it to WEBP first.
+    
+    Reads in blocks whose size is a multiple of 3, so each block encodes to
+    whole base64 quanta and the pieces can be concatenated directly, without
+    holding the raw file in memory alongside its encoding.
+    """
+    import base64
+    
+    if recompress:
+        data = _recompress_image(image_path)
+        if data is not None:
+            return base64.b64encode(data).decode("ascii")
+    
+    out = bytearray()
     with open(image_path, "rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
+        while chunk := f.read(57 * 4096):
+            out += base64.b64encode(chunk)
+    return out.decode("ascii")
 
 
-def delegate(
+@functools.lru_cache(maxsize=64)
+def _swarm_directives(agents: int = None, system: str = None) -> str:
+    """Per-call swarm instructions, sent after the user's task."""
+    directives = []
+    if agents:
+        directives.append(f"Spawn exactly {agents} specialized agents for this task.")
+    if system:
+        directives.append(f"Additional context: {system}")
+    return "\n\n".join(directives)
+
+
+def _load_tools(path: str):
+    """Parse a tools JSON file, reusing the last parse while it's unchanged."""
+    st = os.stat(path)
+    cached = _TOOLS_CACHE.get(path)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    with open(path, "rb") as f:
+        tools = _json_loads(f.read())
+    _TOOLS_CACHE[path] = (st.st_mtime_ns, st.st_size, tools)
+    return tools
+
+
+def _build_payload(
     model: str,
     task: str,
     input_text: str = None,
@@ -92,39 +307,46 @@ def delegate(
     tools_file: str = None,
     json_output: bool = False,
     agents: int = None,
-):
-    """Delegate a task to an Ollama model."""
+    recompress: bool = False,
+) -> dict:
+    """Build the /api/chat request payload for a delegation."""
     
     # Use chat API for full feature support
     messages = []
     
-    # Determine system prompt
+    # Determine system prompt. The swarm prompt is sent verbatim so the
+    # system prefix stays byte-identical across calls and the server's
+    # prompt cache can reuse it; per-call swarm directives go in a
+    # trailing user turn instead.
     if swarm:
         # Agent swarm mode - use the magic prompt
-        swarm_prompt = SWARM_SYSTEM_PROMPT
-        if agents:
-            swarm_prompt += f"\n\nSpawn exactly {agents} specialized agents for this task."
-        if system:
-            swarm_prompt += f"\n\nAdditional context: {system}"
-        messages.append({"role": "system", "content": swarm_prompt})
+        messages.append({"role": "system", "content": SWARM_SYSTEM_PROMPT})
     elif system:
         messages.append({"role": "system", "content": system})
     
-    # Build user message
+    # Build user message. When the input dominates (e.g. a long document),
+    # put it first so repeated tasks over the same input share a prefix.
     user_content = task
     if input_text:
-        user_content = f"{task}\n\n---\n\n{input_text}"
+        if len(input_text) > len(task) * 4:
+            user_content = f"{input_text}\n\n---\n\nTASK: {task}"
+        else:
+            user_content = f"{task}\n\n---\n\n{input_text}"
     
     user_msg = {"role": "user", "content": user_content}
     
     # Add image if provided
     if image:
         if os.path.exists(image):
-            user_msg["images"] = [encode_image(image)]
+            user_msg["images"] = [encode_image(image, recompress)]
         else:
             print(f"Warning: Image file not found: {image}", file=sys.stderr)
     
     messages.append(user_msg)
+    if swarm:
+        directives = _swarm_directives(agents, system)
+        if directives:
+            messages.append({"role": "user", "content": directives})
     
     # Build request payload
     payload = {
@@ -139,23 +361,448 @@ def delegate(
     
     # Add tools if provided
     if tools_file and os.path.exists(tools_file):
-        with open(tools_file) as f:
-            payload["tools"] = json.load(f)
+        payload["tools"] = _load_tools(tools_file)
     
     # Request JSON output
     if json_output:
         payload["format"] = "json"
     
+    return payload
+
+
+def _get_log_fh():
+    """Return the shared, fully buffered log file handle.
+    
+    Opened once per process and flushed at exit, so a batch of delegations
+    costs one open and a handful of write syscalls rather than one each.
+    """
+    global _LOG_FH
+    if _LOG_FH is None:
+        LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+        _LOG_FH = open(LOG_FILE, "ab", buffering=1 << 20)
+        atexit.register(_LOG_FH.close)
+    return _LOG_FH
+
+
+def _task_hash(task: str) -> str:
+    """Short stable hash of a task, for spotting repeats in the log."""
+    return hashlib.blake2b(task.encode(), digest_size=8).hexdigest()
+
+
+def _compact_entry(e: dict) -> dict:
+    """Convert a log entry from the original long-key schema to the compact one."""
+    try:
+        t = int(datetime.fromisoformat(e["timestamp"]).timestamp())
+    except (KeyError, TypeError, ValueError):
+        t = 0
+    tool_calls = e.get("tool_calls", 0)
+    return {
+        "t": t,
+        "m": e.get("model", "unknown"),
+        "pi": e.get("prompt_eval_count", 0),
+        "po": e.get("eval_count", 0),
+        "el": e.get("elapsed_seconds", 0),
+        "fl": (
+            LOG_FLAG_THINKING * bool(e.get("thinking"))
+            | LOG_FLAG_SWARM * bool(e.get("swarm"))
+            | LOG_FLAG_IMAGE * bool(e.get("has_image"))
+            | LOG_FLAG_TOOLS * (tool_calls > 0)
+            | LOG_FLAG_CACHED * bool(e.get("cached"))
+        ),
+        "tc": tool_calls,
+        # Only the preview survives in old entries
+        "hk": _task_hash(e.get("task_preview", "")),
+    }
+
+
+def _log_delegation(
+    model: str,
+    task: str,
+    swarm: bool,
+    image: str,
+    result: dict,
+    elapsed: float,
+    cached: bool = False,
+):
+    """Append a delegation record to the log file as a msgpack frame.
+    
+    Uses the compact schema (see LOG_FLAG_*): short keys, epoch seconds,
+    one flags int, and a hash of the task instead of a preview. Cache hits
+    are logged with zero tokens, since nothing was generated.
+    """
+    message = result.get("message", {})
+    tool_calls = len(message.get("tool_calls", []))
+    flags = (
+        LOG_FLAG_THINKING * bool(message.get("thinking"))
+        | LOG_FLAG_SWARM * bool(swarm)
+        | LOG_FLAG_IMAGE * bool(image)
+        | LOG_FLAG_TOOLS * (tool_calls > 0)
+        | LOG_FLAG_CACHED * bool(cached)
+    )
+    log_entry = {
+        "t": int(time.time()),
+        "m": model,
+        "pi": 0 if cached else result.get("prompt_eval_count", 0),
+        "po": 0 if cached else result.get("eval_count", 0),
+        "el": round(elapsed, 2),
+        "fl": flags,
+        "tc": tool_calls,
+        "hk": _task_hash(task),
+    }
+    
+    _get_log_fh().write(_get_msgpack().packb(log_entry, use_bin_type=True))
+
+
+def _cache_key(payload: dict) -> str:
+    """Hash the canonical JSON form of a payload."""
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _is_cacheable(payload: dict) -> bool:
+    """Whether a response to this payload can be safely reused.
+    
+    Tool calls have side effects on the caller's side, and thinking at the
+    default temperature is non-deterministic, so neither is cached.
+    """
+    if payload.get("tools"):
+        return False
+    if payload.get("think") and payload.get("options", {}).get("temperature") != 0:
+        return False
+    return True
+
+
+def _cache_db():
+    """Open the persistent exact-match cache (once per process)."""
+    global _CACHE_DB
+    if _CACHE_DB is None:
+        import sqlite3
+        
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _CACHE_DB = sqlite3.connect(CACHE_DB, isolation_level=None)
+        _CACHE_DB.execute("PRAGMA journal_mode=WAL")
+        _CACHE_DB.execute("PRAGMA synchronous=NORMAL")
+        _CACHE_DB.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, created INTEGER, response BLOB)"
+        )
+        atexit.register(_CACHE_DB.close)
+    return _CACHE_DB
+
+
+def _cache_failed(tier: str, e: Exception):
+    """Turn a cache tier off for the rest of the run, warning once.
+    
+    The cache is an optimisation: a broken cache directory or database
+    must not fail the delegation, so callers treat it as a miss instead.
+    """
+    if tier not in _CACHE_FAILED:
+        _CACHE_FAILED.add(tier)
+        print(f"Warning: {tier} cache unavailable ({e}); continuing without it", file=sys.stderr)
+
+
+def _cache_get(key: str):
+    """Look up a response by payload hash: in-process first, then SQLite."""
+    if _EXACT_CACHE is not None:
+        result = _EXACT_CACHE.get(key)
+        if result is not None:
+            return result
+    if "exact" in _CACHE_FAILED:
+        return None
+    
+    import sqlite3
+    
+    now = int(time.time())
+    try:
+        row = _cache_db().execute(
+            "SELECT response FROM cache WHERE key = ? AND created > ?",
+            (key, now - CACHE_TTL),
+        ).fetchone()
+        if row is None:
+            return None
+        result = _json_loads(zlib.decompress(row[0]))
+    except (sqlite3.Error, OSError, zlib.error, ValueError) as e:
+        _cache_failed("exact", e)
+        return None
+    if _EXACT_CACHE is not None:
+        _EXACT_CACHE[key] = result
+    return result
+
+
+def _cache_put(key: str, result: dict):
+    if _EXACT_CACHE is not None:
+        _EXACT_CACHE[key] = result
+    
+    if "exact" in _CACHE_FAILED:
+        return
+    
+    import sqlite3
+    
+    now = int(time.time())
     try:
-        start = datetime.now()
-        resp = requests.post(
-            f"{OLLAMA_HOST}/api/chat",
-            json=payload,
-            timeout=600 if swarm else 300  # Longer timeout for swarm
+        db = _cache_db()
+        db.execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+            (key, now, zlib.compress(_json_line(result))),
         )
+        db.execute("DELETE FROM cache WHERE created <= ?", (now - CACHE_TTL,))
+    except (sqlite3.Error, OSError) as e:
+        _cache_failed("exact", e)
+
+
+def _get_embedder():
+    """Load the sentence-transformers model for the semantic cache (once)."""
+    global _EMBEDDER
+    if _EMBEDDER is None:
+        from sentence_transformers import SentenceTransformer
+        _EMBEDDER = SentenceTransformer(SEMANTIC_MODEL)
+    return _EMBEDDER
+
+
+def _semantic_db():
+    import sqlite3
+    
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(SEMANTIC_CACHE_DB, isolation_level=None)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS semantic_cache "
+        "(scope TEXT, created INTEGER, embedding BLOB, response BLOB)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS semantic_scope ON semantic_cache (scope)")
+    return conn
+
+
+def _semantic_scope(payload: dict) -> str:
+    """Hash everything in the payload except the user's task text.
+    
+    Only responses produced with the same model, system prompt, images and
+    options are candidates for a semantic match.
+    """
+    scoped = copy.deepcopy(payload)
+    for msg in scoped["messages"]:
+        if msg["role"] == "user":
+            msg["content"] = ""
+            break
+    return _cache_key(scoped)
+
+
+def _semantic_lookup(payload: dict, text: str):
+    """Return a cached result whose prompt embedding is close enough, or None."""
+    if "semantic" in _CACHE_FAILED:
+        return None
+    
+    import sqlite3
+    import numpy as np
+    
+    try:
+        query = _get_embedder().encode(text, normalize_embeddings=True).astype(np.float32)
+        conn = _semantic_db()
+        try:
+            rows = conn.execute(
+                "SELECT embedding, response FROM semantic_cache WHERE scope = ? AND created > ?",
+                (_semantic_scope(payload), int(time.time()) - CACHE_TTL),
+            ).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return None
+        
+        # Rows from a different embedding model won't line up: ValueError
+        matrix = np.stack([np.frombuffer(r[0], dtype=np.float32) for r in rows])
+        scores = matrix @ query
+        best = int(scores.argmax())
+        if scores[best] >= SEMANTIC_THRESHOLD:
+            return _json_loads(rows[best][1])
+    except (sqlite3.Error, OSError, ValueError, RuntimeError) as e:
+        _cache_failed("semantic", e)
+    return None
+
+
+def _semantic_store(payload: dict, text: str, result: dict):
+    if "semantic" in _CACHE_FAILED:
+        return
+    
+    import sqlite3
+    import numpy as np
+    
+    now = int(time.time())
+    try:
+        embedding = _get_embedder().encode(text, normalize_embeddings=True).astype(np.float32)
+        conn = _semantic_db()
+        try:
+            conn.execute(
+                "INSERT INTO semantic_cache VALUES (?, ?, ?, ?)",
+                (_semantic_scope(payload), now, embedding.tobytes(), _json_line(result)),
+            )
+            conn.execute("DELETE FROM semantic_cache WHERE created <= ?", (now - CACHE_TTL,))
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError, ValueError, RuntimeError) as e:
+        _cache_failed("semantic", e)
+
+
+def _stream_chat(payload: dict, timeout: float) -> dict:
+    """POST a streaming /api/chat request, echoing output as it arrives.
+    
+    Returns the assembled response; see `_echo_stream`.
+    """
+    with _get_client().stream(
+        "POST",
+        f"{OLLAMA_HOST}/api/chat",
+        json={**payload, "stream": True},
+        timeout=_http_timeout(timeout),
+    ) as resp:
         resp.raise_for_status()
-        result = resp.json()
-        elapsed = (datetime.now() - start).total_seconds()
+        return _echo_stream(resp.iter_lines())
+
+
+def _echo_stream(lines) -> dict:
+    """Echo streamed chat frames as they arrive and assemble the response.
+    
+    Content deltas go to stdout and thinking deltas to stderr. Returns the
+    assembled message plus the final frame's token counts, in the same
+    shape as a non-streaming response.
+    """
+    content, thinking, tool_calls = [], [], []
+    in_thinking = False
+    result = {}
+    out = sys.stdout.buffer
+    
+    for line in lines:
+        if not line:
+            continue
+        chunk = _json_loads(line)
+        if chunk.get("error"):
+            raise RuntimeError(chunk["error"])
+        message = chunk.get("message", {})
+        
+        if message.get("thinking"):
+            if not in_thinking:
+                print("=== THINKING ===", file=sys.stderr)
+                in_thinking = True
+            thinking.append(message["thinking"])
+            sys.stderr.write(message["thinking"])
+            sys.stderr.flush()
+        
+        if message.get("content"):
+            if in_thinking:
+                print("\n=== END THINKING ===\n", file=sys.stderr)
+                in_thinking = False
+            content.append(message["content"])
+            out.write(message["content"].encode())
+            out.flush()
+        
+        tool_calls.extend(message.get("tool_calls", []))
+        
+        if chunk.get("done"):
+            result = chunk
+            break
+    
+    if in_thinking:
+        print("\n=== END THINKING ===\n", file=sys.stderr)
+    
+    result["message"] = {
+        "role": "assistant",
+        "content": "".join(content),
+        "thinking": "".join(thinking),
+        "tool_calls": tool_calls,
+    }
+    return result
+
+
+def _shared_prefix_len(payload: dict) -> int:
+    """Bytes of the request body that come before the first user turn.
+    
+    Everything up to there (model, system prompt) is identical across calls
+    with the same settings, so it's the most --hash-prefix should cover.
+    """
+    marker = os.urandom(8).hex()
+    messages = list(payload["messages"])
+    for n, msg in enumerate(messages):
+        if msg["role"] == "user":
+            messages[n] = {**msg, "content": marker}
+            break
+    probe = {**payload, "messages": messages}
+    wire = _get_client().build_request("POST", f"{OLLAMA_HOST}/api/chat", json=probe).content
+    return wire.index(marker.encode())
+
+
+def delegate(
+    model: str,
+    task: str,
+    input_text: str = None,
+    system: str = None,
+    think: bool = False,
+    swarm: bool = False,
+    image: str = None,
+    tools_file: str = None,
+    json_output: bool = False,
+    agents: int = None,
+    use_cache: bool = True,
+    semantic_cache: bool = False,
+    recompress: bool = False,
+    print_payload: bool = False,
+    hash_prefix: int = None,
+):
+    """Delegate a task to an Ollama model."""
+    payload = _build_payload(
+        model, task, input_text, system, think, swarm, image, tools_file, json_output, agents,
+        recompress,
+    )
+    
+    # Inspect the request without calling the model
+    if print_payload or hash_prefix is not None:
+        payload["stream"] = True  # As sent by _stream_chat
+        if print_payload:
+            if orjson is not None:
+                sys.stdout.buffer.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+                sys.stdout.flush()
+            else:
+                print(json.dumps(payload, indent=2, ensure_ascii=False))
+        if hash_prefix is not None:
+            # Hash the exact request body the HTTP client would send
+            wire = _get_client().build_request("POST", f"{OLLAMA_HOST}/api/chat", json=payload).content
+            print(f"sha256[:{hash_prefix}]: {hashlib.sha256(wire[:hash_prefix]).hexdigest()}")
+            print(f"Shared prefix: {_shared_prefix_len(payload)} of {len(wire)} bytes", file=sys.stderr)
+        return
+    
+    httpx = _get_httpx()
+    cacheable = use_cache and _is_cacheable(payload)
+    if semantic_cache and cacheable:
+        try:
+            _get_embedder()
+        except ImportError:
+            print("Warning: --semantic-cache needs sentence-transformers; using exact cache only", file=sys.stderr)
+            semantic_cache = False
+        except OSError as e:  # Model download or load failed
+            print(f"Warning: could not load {SEMANTIC_MODEL} ({e}); using exact cache only", file=sys.stderr)
+            semantic_cache = False
+    semantic_text = f"{task}\n\n{input_text}" if input_text else task
+    
+    try:
+        start = time.perf_counter()
+        result = None
+        cache_hit = None
+        if cacheable:
+            key = _cache_key(payload)
+            result = _cache_get(key)
+            cache_hit = "exact" if result is not None else None
+            if result is None and semantic_cache:
+                result = _semantic_lookup(payload, semantic_text)
+                cache_hit = "semantic" if result is not None else None
+        
+        streamed = result is None
+        if streamed:
+            result = _stream_chat(
+                payload,
+                timeout=600 if swarm else 300  # Longer timeout for swarm
+            )
+            print()  # Finish the streamed response line
+            if cacheable:
+                _cache_put(key, result)
+                if semantic_cache:
+                    _semantic_store(payload, semantic_text, result)
+        elapsed = time.perf_counter() - start
         
         message = result.get("message", {})
         response_text = message.get("content", "")
@@ -163,27 +810,10 @@ def delegate(
         tool_calls = message.get("tool_calls", [])
         
         # Log the delegation
-        log_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "model": model,
-            "task_preview": task[:100],
-            "input_chars": len(input_text) if input_text else 0,
-            "output_chars": len(response_text),
-            "thinking": bool(thinking_text),
-            "swarm": swarm,
-            "tool_calls": len(tool_calls),
-            "has_image": bool(image),
-            "prompt_eval_count": result.get("prompt_eval_count", 0),
-            "eval_count": result.get("eval_count", 0),
-            "elapsed_seconds": round(elapsed, 2),
-        }
-        
-        LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(LOG_FILE, "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
+        _log_delegation(model, task, swarm, image, result, elapsed, bool(cache_hit))
         
-        # Output thinking if present
-        if thinking_text:
+        # Output thinking if present (already echoed when streamed)
+        if thinking_text and not streamed:
             print("=== THINKING ===", file=sys.stderr)
             print(thinking_text, file=sys.stderr)
             print("=== END THINKING ===\n", file=sys.stderr)
@@ -194,14 +824,21 @@ def delegate(
             print(json.dumps(tool_calls, indent=2), file=sys.stderr)
             print("=== END TOOL CALLS ===\n", file=sys.stderr)
         
-        # Output the response
-        print(response_text)
+        # Output the response (already echoed when streamed)
+        if not streamed:
+            print(response_text)
         
         # Stats to stderr
         print(f"\n--- Worker Stats ---", file=sys.stderr)
         print(f"Model: {model}", file=sys.stderr)
-        print(f"Tokens: {result.get('prompt_eval_count', '?')} in, {result.get('eval_count', '?')} out", file=sys.stderr)
+        if cache_hit:
+            # Nothing was generated; matches the zero tokens in the log
+            print("Tokens: 0 in, 0 out (cached)", file=sys.stderr)
+        else:
+            print(f"Tokens: {result.get('prompt_eval_count', '?')} in, {result.get('eval_count', '?')} out", file=sys.stderr)
         print(f"Time: {elapsed:.1f}s", file=sys.stderr)
+        if cache_hit:
+            print(f"Cache: {cache_hit} hit", file=sys.stderr)
         if swarm:
             print(f"Mode: 🐝 Agent Swarm", file=sys.stderr)
         elif think:
@@ -209,10 +846,10 @@ def delegate(
         if image:
             print(f"Vision: {image}", file=sys.stderr)
         
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         print("Error: Cannot connect to Ollama. Is it running?", file=sys.stderr)
         sys.exit(1)
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         print("Error: Request timed out", file=sys.stderr)
         sys.exit(1)
     except Exception as e:
@@ -220,59 +857,479 @@ def delegate(
         sys.exit(1)
 
 
+async def _one_call(client, payload: dict, timeout: float) -> dict:
+    """Send a single /api/chat request on a shared async client."""
+    resp = await client.post(
+        f"{OLLAMA_HOST}/api/chat",
+        json=payload,
+        timeout=_http_timeout(timeout),
+    )
+    resp.raise_for_status()
+    return _json_loads(resp.content)
+
+
+async def _swarm_delegate(
+    model: str,
+    task: str,
+    input_text: str,
+    system: str,
+    agents: int,
+    json_output: bool,
+) -> dict:
+    """Run an agent swarm client-side: decompose, fan out, synthesize.
+    
+    One JSON-mode call splits the task into `agents` sub-tasks, the agents
+    run concurrently (at most SWARM_MAX_CONCURRENCY at once), and a final
+    call integrates their reports. Agents and synthesis always think, as
+    --swarm does in the single-prompt version. Returns a result shaped like
+    a chat response, with token counts summed over every call.
+    """
+    import asyncio
+    
+    concurrency = min(agents, SWARM_MAX_CONCURRENCY)
+    sem = asyncio.Semaphore(concurrency)
+    results = []
+    
+    async with _async_client(concurrency) as client:
+        # 1. Decompose
+        plan_payload = _build_payload(
+            model,
+            f"Split this task across exactly {agents} agents.\n\nTASK: {task}",
+            input_text,
+            SWARM_DECOMPOSE_PROMPT,
+            json_output=True,
+        )
+        plan = await _one_call(client, plan_payload, 300)
+        results.append(plan)
+        plan_json = _json_loads(plan.get("message", {}).get("content") or "{}")
+        roster = plan_json.get("agents") if isinstance(plan_json, dict) else None
+        if not roster:
+            raise RuntimeError("Swarm decomposition returned no agents")
+        if not isinstance(roster, list) or not all(isinstance(a, dict) for a in roster):
+            raise RuntimeError("Swarm decomposer returned malformed agents")
+        roster = roster[:agents]  # The model may over-deliver
+        
+        # 2. Fan out
+        agent_system = SWARM_AGENT_PROMPT
+        if system:
+            agent_system += f"\n\nAdditional context: {system}"
+        
+        async def run_agent(n: int, agent: dict) -> dict:
+            role = agent.get("role", "Specialist")
+            payload = _build_payload(
+                model,
+                f"You are Agent-{n}: {role}.\n\nOverall task: {task}\n\nYour sub-task: {agent.get('subtask', task)}",
+                input_text,
+                agent_system,
+                think=True,
+            )
+            async with sem:
+                return await _one_call(client, payload, 300)
+        
+        reports = await asyncio.gather(
+            *(run_agent(n, a) for n, a in enumerate(roster, 1))
+        )
+        results.extend(reports)
+        
+        sections = [
+            f"### Agent-{n}: {agent.get('role', 'Specialist')}\n\n"
+            + report.get("message", {}).get("content", "")
+            for n, (agent, report) in enumerate(zip(roster, reports), 1)
+        ]
+        
+        # 3. Synthesize
+        synthesis_payload = _build_payload(
+            model,
+            f"Synthesize the agent reports into a unified response.\n\nTASK: {task}",
+            "\n\n".join(sections),
+            SWARM_SYNTHESIS_PROMPT,
+            think=True,
+            json_output=json_output,
+        )
+        synthesis = await _one_call(client, synthesis_payload, 600)
+        results.append(synthesis)
+    
+    synthesis_text = synthesis.get("message", {}).get("content", "")
+    if json_output:
+        content = synthesis_text
+    else:
+        content = "\n\n".join([
+            "[ORCHESTRATION PROTOCOL INITIATED]",
+            *sections,
+            f"### Synthesis Coordinator\n\n{synthesis_text}",
+            "[ORCHESTRATION COMPLETE - All agents terminated]",
+        ])
+    
+    return {
+        "message": {
+            "role": "assistant",
+            "content": content,
+            "thinking": "\n\n".join(
+                r.get("message", {}).get("thinking", "") for r in results
+            ).strip(),
+        },
+        "prompt_eval_count": sum(r.get("prompt_eval_count", 0) for r in results),
+        "eval_count": sum(r.get("eval_count", 0) for r in results),
+        "agents": len(roster),
+    }
+
+
+def delegate_swarm(
+    model: str,
+    task: str,
+    input_text: str = None,
+    system: str = None,
+    agents: int = None,
+    json_output: bool = False,
+):
+    """Delegate a task as a client-side parallel agent swarm."""
+    import asyncio
+    
+    httpx = _get_httpx()
+    try:
+        start = time.perf_counter()
+        result = asyncio.run(
+            _swarm_delegate(model, task, input_text, system, agents, json_output)
+        )
+        elapsed = time.perf_counter() - start
+    except httpx.ConnectError:
+        print("Error: Cannot connect to Ollama. Is it running?", file=sys.stderr)
+        sys.exit(1)
+    except httpx.TimeoutException:
+        print("Error: Request timed out", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    _log_delegation(model, task, True, None, result, elapsed)
+    
+    thinking_text = result["message"].get("thinking", "")
+    if thinking_text:
+        print("=== THINKING ===", file=sys.stderr)
+        print(thinking_text, file=sys.stderr)
+        print("=== END THINKING ===\n", file=sys.stderr)
+    
+    print(result["message"]["content"])
+    
+    print(f"\n--- Worker Stats ---", file=sys.stderr)
+    print(f"Model: {model}", file=sys.stderr)
+    print(f"Tokens: {result['prompt_eval_count']} in, {result['eval_count']} out", file=sys.stderr)
+    print(f"Time: {elapsed:.1f}s", file=sys.stderr)
+    print(f"Mode: 🐝 Agent Swarm (parallel, {result['agents']} agents)", file=sys.stderr)
+
+
+async def run_batch(tasks: list, concurrency: int, use_cache: bool = True) -> list:
+    """Run delegations concurrently, at most `concurrency` in flight at once.
+    
+    Each task is a dict of `_build_payload` keyword arguments. Returns one
+    record per task, in input order.
+    """
+    import asyncio
+    
+    sem = asyncio.Semaphore(concurrency)
+    
+    async with _async_client(concurrency) as client:
+        async def run(index: int, task: dict) -> dict:
+            timeout = 600 if task.get("swarm") else 300
+            async with sem:
+                start = time.perf_counter()
+                # Any failure (bad tools file, unreadable image, HTTP error)
+                # is reported for this task alone
+                try:
+                    # Reading, base64-encoding and maybe re-encoding an image
+                    # would stall every request in flight on the event loop
+                    payload = await asyncio.to_thread(_build_payload, **task)
+                    cacheable = use_cache and _is_cacheable(payload)
+                    key = _cache_key(payload) if cacheable else None
+                    result = _cache_get(key) if key else None
+                    cached = result is not None
+                    if not cached:
+                        result = await _one_call(client, payload, timeout)
+                        if key:
+                            _cache_put(key, result)
+                except Exception as e:
+                    return {"index": index, "error": str(e) or type(e).__name__}
+                elapsed = time.perf_counter() - start
+            
+            _log_delegation(
+                task["model"], task["task"], task.get("swarm", False),
+                task.get("image"), result, elapsed, cached,
+            )
+            message = result.get("message", {})
+            return {
+                "index": index,
+                "model": task["model"],
+                "response": message.get("content", ""),
+                "thinking": message.get("thinking", ""),
+                "tool_calls": message.get("tool_calls", []),
+                "prompt_eval_count": 0 if cached else result.get("prompt_eval_count", 0),
+                "eval_count": 0 if cached else result.get("eval_count", 0),
+                "elapsed_seconds": round(elapsed, 2),
+                "cached": cached,
+            }
+        
+        return await asyncio.gather(*(run(i, t) for i, t in enumerate(tasks)))
+
+
+# Keys accepted in a --batch JSONL line, mapped to _build_payload arguments
+BATCH_KEYS = {
+    "model": "model",
+    "task": "task",
+    "input": "input_text",
+    "system": "system",
+    "think": "think",
+    "swarm": "swarm",
+    "agents": "agents",
+    "image": "image",
+    "tools": "tools_file",
+    "json": "json_output",
+    "recompress": "recompress",
+}
+
+
+def delegate_batch(batch_file: str, default_model: str, concurrency: int, use_cache: bool = True):
+    """Delegate every task in a JSONL file concurrently.
+    
+    Each line is an object with the same keys as the delegate flags
+    (task, input, system, model, think, swarm, agents, image, tools, json,
+    recompress).
+    Results are written to stdout as JSONL, one line per task in input order.
+    """
+    import asyncio
+    
+    tasks = []
+    with open(batch_file) as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = _json_loads(line)
+            except ValueError as e:
+                print(f"Error: {batch_file}:{lineno}: invalid JSON ({e})", file=sys.stderr)
+                sys.exit(1)
+            if not isinstance(entry, dict) or "task" not in entry:
+                print(f"Error: {batch_file}:{lineno}: missing \"task\"", file=sys.stderr)
+                sys.exit(1)
+            task = {arg: entry[key] for key, arg in BATCH_KEYS.items() if key in entry}
+            task.setdefault("model", default_model)
+            tasks.append(task)
+    
+    if not tasks:
+        print("No tasks in batch file.", file=sys.stderr)
+        return
+    
+    start = time.perf_counter()
+    results = asyncio.run(run_batch(tasks, max(1, concurrency), use_cache))
+    elapsed = time.perf_counter() - start
+    
+    for record in results:
+        sys.stdout.buffer.write(_json_line(record))
+    sys.stdout.flush()
+    
+    failed = sum(1 for r in results if "error" in r)
+    print(f"\n--- Batch Stats ---", file=sys.stderr)
+    print(f"Tasks: {len(results)} ({failed} failed)", file=sys.stderr)
+    print(f"Concurrency: {concurrency}", file=sys.stderr)
+    print(f"Time: {elapsed:.1f}s", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+def _empty_stats() -> dict:
+    """Fresh aggregate for the stats sidecar."""
+    return {
+        "version": STATS_VERSION,
+        "inode": None,
+        "last_offset": 0,
+        "total": 0,
+        "thinking": 0,
+        "swarm": 0,
+        "vision": 0,
+        "tools": 0,
+        "cached": 0,
+        "by_model": {},
+    }
+
+
+def _merge_entry(stats: dict, e: dict):
+    """Fold one log entry into the running aggregate."""
+    if "m" not in e:
+        e = _compact_entry(e)  # Not yet migrated
+    model = e["m"]
+    by_model = stats["by_model"].get(model)
+    if by_model is None:
+        by_model = stats["by_model"][model] = {"count": 0, "tokens_in": 0, "tokens_out": 0, "time": 0}
+    by_model["count"] += 1
+    by_model["tokens_in"] += e.get("pi", 0)
+    by_model["tokens_out"] += e.get("po", 0)
+    by_model["time"] += e.get("el", 0)
+    
+    stats["total"] += 1
+    flags = e.get("fl", 0)
+    if flags & LOG_FLAG_THINKING:
+        stats["thinking"] += 1
+    if flags & LOG_FLAG_IMAGE:
+        stats["vision"] += 1
+    if flags & LOG_FLAG_TOOLS:
+        stats["tools"] += 1
+    if flags & LOG_FLAG_SWARM:
+        stats["swarm"] += 1
+    if flags & LOG_FLAG_CACHED:
+        stats["cached"] += 1
+
+
+def _is_log_entry(e) -> bool:
+    """Whether a decoded frame looks like a log entry rather than garbage."""
+    if not isinstance(e, dict):
+        return False
+    if "m" not in e:
+        return "model" in e  # Not yet migrated
+    return isinstance(e["m"], str) and all(
+        isinstance(e.get(k, 0), (int, float)) for k in ("pi", "po", "el", "fl")
+    )
+
+
+def _read_log(f, offset: int = 0):
+    """Yield (entry, end_offset) for each whole record in the log from offset.
+    
+    A record still being written at the end of the file is left for the
+    next call. Corrupt bytes (e.g. a torn record that later appends were
+    written after) are reported and skipped by resyncing on LOG_FRAME_MARK.
+    """
+    msgpack = _get_msgpack()
+    while True:
+        f.seek(offset)
+        unpacker = msgpack.Unpacker(f, raw=False)
+        good = offset
+        try:
+            for entry in unpacker:
+                if not _is_log_entry(entry):
+                    raise ValueError("not a log entry")
+                good = offset + unpacker.tell()
+                yield entry, good
+            return
+        except ValueError:  # Includes msgpack's format errors and bad UTF-8
+            pass
+        
+        f.seek(good + 1)
+        skip = f.read().find(LOG_FRAME_MARK)
+        if skip == -1:
+            print(f"Warning: corrupt record at byte {good} of {LOG_FILE}; ignoring the rest", file=sys.stderr)
+            return
+        offset = good + 1 + skip
+        print(f"Warning: skipped {offset - good} corrupt bytes at byte {good} of {LOG_FILE}", file=sys.stderr)
+
+
+def _update_stats() -> dict:
+    """Bring the stats sidecar up to date with the log and return it.
+    
+    Only records appended since the last run are decoded. If the log was
+    rotated or truncated (inode changed, or it shrank), the aggregate is
+    rebuilt from the start.
+    """
+    try:
+        stats = _json_loads(STATS_FILE.read_bytes())
+    except (OSError, ValueError):
+        stats = _empty_stats()
+    
+    st = os.stat(LOG_FILE)
+    if (
+        stats.get("version") != STATS_VERSION
+        or stats["inode"] != st.st_ino
+        or st.st_size < stats["last_offset"]
+    ):
+        stats = _empty_stats()
+    
+    if st.st_size == stats["last_offset"]:
+        return stats
+    
+    with open(LOG_FILE, "rb") as f:
+        for entry, end in _read_log(f, stats["last_offset"]):
+            _merge_entry(stats, entry)
+            stats["last_offset"] = end
+    stats["inode"] = st.st_ino
+    
+    tmp = STATS_FILE.with_suffix(".tmp")
+    tmp.write_bytes(_json_line(stats))
+    os.replace(tmp, STATS_FILE)
+    return stats
+
+
 def show_stats():
     """Show delegation statistics."""
+    if LEGACY_LOG_FILE.exists():
+        print(f"Note: {LEGACY_LOG_FILE} isn't counted; run `worker.py migrate-log` to include it.\n", file=sys.stderr)
     if not LOG_FILE.exists():
         print("No delegations logged yet.")
         return
     
-    entries = []
-    with open(LOG_FILE) as f:
-        for line in f:
-            if line.strip():
-                entries.append(json.loads(line))
-    
-    if not entries:
+    stats = _update_stats()
+    if not stats["total"]:
         print("No delegations logged yet.")
         return
     
-    # Aggregate by model
-    by_model = {}
-    total_thinking = 0
-    total_vision = 0
-    total_tools = 0
-    total_swarm = 0
-    
-    for e in entries:
-        model = e.get("model", "unknown")
-        if model not in by_model:
-            by_model[model] = {"count": 0, "tokens_in": 0, "tokens_out": 0, "time": 0}
-        by_model[model]["count"] += 1
-        by_model[model]["tokens_in"] += e.get("prompt_eval_count", 0)
-        by_model[model]["tokens_out"] += e.get("eval_count", 0)
-        by_model[model]["time"] += e.get("elapsed_seconds", 0)
-        
-        if e.get("thinking"):
-            total_thinking += 1
-        if e.get("has_image"):
-            total_vision += 1
-        if e.get("tool_calls", 0) > 0:
-            total_tools += 1
-        if e.get("swarm"):
-            total_swarm += 1
-    
-    print(f"Total delegations: {len(entries)}")
-    print(f"  With thinking: {total_thinking}")
-    print(f"  With swarm: {total_swarm}")
-    print(f"  With vision: {total_vision}")
-    print(f"  With tool calls: {total_tools}")
+    print(f"Total delegations: {stats['total']}")
+    print(f"  With thinking: {stats['thinking']}")
+    print(f"  With swarm: {stats['swarm']}")
+    print(f"  With vision: {stats['vision']}")
+    print(f"  With tool calls: {stats['tools']}")
+    print(f"  From cache: {stats['cached']}")
     
     print(f"\nBy model:")
-    for model, stats in sorted(by_model.items(), key=lambda x: -x[1]["count"]):
+    for model, m in sorted(stats["by_model"].items(), key=lambda x: -x[1]["count"]):
         print(f"  {model}:")
-        print(f"    Count: {stats['count']}")
-        print(f"    Tokens: {stats['tokens_in']:,} in, {stats['tokens_out']:,} out")
-        print(f"    Time: {stats['time']:.1f}s total")
+        print(f"    Count: {m['count']}")
+        print(f"    Tokens: {m['tokens_in']:,} in, {m['tokens_out']:,} out")
+        print(f"    Time: {m['time']:.1f}s total")
+
+
+def migrate_log():
+    """Rewrite the log in the current format: msgpack frames, compact schema.
+    
+    Entries from the legacy JSONL log go first, followed by the existing
+    msgpack log with any long-key entries compacted. The result replaces
+    LOG_FILE atomically, and the JSONL file is kept as *.jsonl.migrated.
+    """
+    if not LEGACY_LOG_FILE.exists() and not LOG_FILE.exists():
+        print("Nothing to migrate: no delegation log found.")
+        return
+    
+    msgpack = _get_msgpack()
+    old_size = 0
+    count = converted = 0
+    tmp = LOG_FILE.with_suffix(".tmp")
+    with open(tmp, "wb") as out:
+        def write(e: dict):
+            nonlocal count, converted
+            if "m" not in e:
+                e = _compact_entry(e)
+                converted += 1
+            out.write(msgpack.packb(e, use_bin_type=True))
+            count += 1
+        
+        if LEGACY_LOG_FILE.exists():
+            old_size += LEGACY_LOG_FILE.stat().st_size
+            with open(LEGACY_LOG_FILE, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        write(_json_loads(line))
+        if LOG_FILE.exists():
+            old_size += LOG_FILE.stat().st_size
+            with open(LOG_FILE, "rb") as f:
+                for e, _ in _read_log(f):
+                    write(e)
+    
+    if not converted and not LEGACY_LOG_FILE.exists():
+        tmp.unlink()
+        print(f"Nothing to migrate: {LOG_FILE} is already up to date.")
+        return
+    
+    os.replace(tmp, LOG_FILE)
+    if LEGACY_LOG_FILE.exists():
+        LEGACY_LOG_FILE.rename(LEGACY_LOG_FILE.with_suffix(".jsonl.migrated"))
+    print(f"Migrated {count} entries ({converted} converted to the compact schema)")
+    print(f"Log size: {old_size:,} -> {LOG_FILE.stat().st_size:,} bytes")
 
 
 def main():
@@ -285,24 +1342,48 @@ def main():
     # delegate command
     delegate_parser = subparsers.add_parser("delegate", help="Delegate a task")
     delegate_parser.add_argument("--model", "-m", default=DEFAULT_MODEL, help=f"Model to use (default: {DEFAULT_MODEL})")
-    delegate_parser.add_argument("--task", "-t", required=True, help="Task description/prompt")
+    delegate_parser.add_argument("--task", "-t", help="Task description/prompt")
     delegate_parser.add_argument("--input", "-i", help="Input text to process")
     delegate_parser.add_argument("--system", "-s", help="System prompt")
     delegate_parser.add_argument("--think", action="store_true", help="Enable thinking/reasoning mode")
     delegate_parser.add_argument("--swarm", action="store_true", help="Enable Agent Swarm mode (auto-decompose into sub-agents)")
-    delegate_parser.add_argument("--agents", type=int, help="Number of agents to spawn (with --swarm)")
+    delegate_parser.add_argument("--agents", type=int, help="Number of agents to spawn (with --swarm); runs them as parallel requests")
+    delegate_parser.add_argument("--monolithic", action="store_true", help="With --swarm --agents, simulate all agents in a single request instead")
     delegate_parser.add_argument("--image", help="Path to image file (for vision)")
+    delegate_parser.add_argument("--recompress", action="store_true", help="Re-encode jpg/png/bmp images over 100 KB as WEBP before sending (needs Pillow)")
     delegate_parser.add_argument("--tools", help="Path to tools JSON file")
     delegate_parser.add_argument("--json", action="store_true", help="Request JSON output")
+    delegate_parser.add_argument("--no-cache", action="store_true", help="Always call the model, bypassing the response cache")
+    delegate_parser.add_argument("--semantic-cache", action="store_true", help=f"Reuse responses to similar prompts (cosine >= {SEMANTIC_THRESHOLD}); needs sentence-transformers")
+    delegate_parser.add_argument("--print-payload", action="store_true", help="Print the request payload and exit without calling the model")
+    delegate_parser.add_argument("--hash-prefix", type=int, metavar="N", help="Print the sha256 of the payload's first N bytes and where the shared prefix ends, then exit (compare runs for prompt-cache prefix reuse)")
+    delegate_parser.add_argument("--batch", help="Path to JSONL file of tasks to run concurrently")
+    delegate_parser.add_argument("--concurrency", "-c", type=int, default=DEFAULT_CONCURRENCY, help=f"Max concurrent requests with --batch (default: {DEFAULT_CONCURRENCY})")
     
     # stats command
     subparsers.add_parser("stats", help="Show delegation statistics")
     
+    # migrate-log command
+    subparsers.add_parser("migrate-log", help="Convert older logs to the current msgpack format")
+    
     args = parser.parse_args()
     
     if args.command == "models":
         list_models()
+    elif args.command == "delegate" and args.batch:
+        delegate_batch(args.batch, args.model, args.concurrency, not args.no_cache)
     elif args.command == "delegate":
+        if not args.task:
+            parser.error("delegate: --task is required (or use --batch)")
+        if args.agents is not None and args.agents < 1:
+            parser.error("delegate: --agents must be at least 1")
+        inspect_only = args.print_payload or args.hash_prefix is not None
+        if args.swarm and args.agents and not args.monolithic and not inspect_only:
+            if args.image or args.tools:
+                print("Note: parallel swarm doesn't support --image/--tools; running monolithic swarm", file=sys.stderr)
+            else:
+                delegate_swarm(args.model, args.task, args.input, args.system, args.agents, args.json)
+                return
         delegate(
             args.model,
             args.task,
@@ -314,12 +1395,23 @@ def main():
             args.tools,
             args.json,
             getattr(args, 'agents', None),
+            not args.no_cache,
+            args.semantic_cache,
+            args.recompress,
+            args.print_payload,
+            args.hash_prefix,
         )
     elif args.command == "stats":
         show_stats()
+    elif args.command == "migrate-log":
+        migrate_log()
     else:
         parser.print_help()
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nInterrupted", file=sys.stderr)
+        sys.exit(130)